@@ -60,6 +60,18 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # テストフィクスチャなどから確立済みのコネクションを渡された場合はそれを再利用する
+    # (インメモリSQLiteでは別コネクションから同じDBが見えないため)
+    connection = config.attributes.get("connection", None)
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
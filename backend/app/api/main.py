@@ -1,9 +1,40 @@
+import os
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
 
 from app.api.routers import movies
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリケーション起動時にレスポンスキャッシュを初期化する
+
+    REDIS_URLが設定されている場合はRedisを、未設定の場合はインメモリをバックエンドとする
+    """
+    # 同期defのエンドポイントはスレッドプールで実行されるため、
+    # デフォルトの40トークンでは同時リクエスト数の上限になりやすい
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.environ.get("THREADPOOL_SIZE", "100"))
+
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        from fastapi_cache.backends.redis import RedisBackend
+        from redis import asyncio as aioredis
+
+        FastAPICache.init(RedisBackend(aioredis.from_url(redis_url)), prefix="movies")
+    else:
+        FastAPICache.init(InMemoryBackend(), prefix="movies")
+    yield
+
+# orjsonは標準のjsonよりネストしたレスポンスのエンコードが大幅に速い
+# https://fastapi.tiangolo.com/advanced/custom-response/#use-orjsonresponse
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 @app.get(path="/")
 async def health():
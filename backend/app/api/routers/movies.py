@@ -1,33 +1,132 @@
+import os
+import pathlib
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, ORJSONResponse
+from fastapi_cache.decorator import cache
+from pydantic import TypeAdapter
 from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.api.schemas.movies import MovieCreate, MovieResponse
-from app.persistence.repositories import MovieRepository
+from app.persistence.repositories import MovieRepository, PosterRepository
+from app.persistence.unit_of_work import PosterFileStorageSession
 
 
 router = APIRouter(
     prefix="/movies",
     tags=["movies"],
 )
-engine = create_engine("sqlite:////home/tatsuro/workspaces/netflix-clone-app/backend/netflix.db", echo=True)
-
-def get_db():    
-    db = scoped_session(
-                sessionmaker(
-                    bind=engine,
-                    autocommit=False,
-                    autoflush=False
-                )
-            )
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./netflix.db")
+
+# NOTE: echo=Trueはリクエストごとに全SQLをstdoutへ出力するため、開発時のみLOG_SQL=trueで有効にする
+LOG_SQL = os.environ.get("LOG_SQL", "false").lower() == "true"
+
+if DATABASE_URL == "sqlite://" or (DATABASE_URL.startswith("sqlite") and ":memory:" in DATABASE_URL):
+    # インメモリSQLiteはコネクションごとに別のDBになるため、単一コネクションを共有する
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#threading-pooling-behavior
+    engine = create_engine(
+        DATABASE_URL,
+        echo=LOG_SQL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+elif DATABASE_URL.startswith("sqlite"):
+    # ファイルSQLiteは複数コネクションで並行リードできるため、通常のプールを使う
+    # (StaticPoolだと全セッションが1コネクションを共有し、トランザクション分離が壊れる)
+    engine = create_engine(
+        DATABASE_URL,
+        echo=LOG_SQL,
+        connect_args={"check_same_thread": False},
+        pool_size=int(os.environ.get("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
+else:
+    # PostgreSQLなどのサーバ型DBでは、プールサイズ不足によるQueuePoolのロックアップを防ぐ
+    # https://docs.sqlalchemy.org/en/20/core/pooling.html
+    engine = create_engine(
+        DATABASE_URL,
+        echo=LOG_SQL,
+        pool_size=int(os.environ.get("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
+
+# コンパイル済みSQLのキャッシュを明示的なdictに固定し、LRUキャッシュの
+# キー構築・エビクションのオーバーヘッドを避ける
+# https://docs.sqlalchemy.org/en/20/core/connections.html#engine-compiled-cache
+_COMPILED_CACHE: dict = {}
+engine = engine.execution_options(compiled_cache=_COMPILED_CACHE)
+
+# sessionmakerはリクエストごとに作り直す必要がないため、モジュールレベルで一度だけ構築する
+# https://docs.sqlalchemy.org/en/20/orm/session_basics.html#using-a-sessionmaker
+SessionLocal = sessionmaker(
+    bind=engine,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+def get_db():
+    # FastAPIのDependsがリクエストスコープを保証するため、scoped_sessionは不要
+    db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 
-@router.get("", response_model=list[MovieResponse])
-async def read_movies(db=Depends(get_db)):
+# リクエスト毎にレスポンス検証器を組み立て直さないよう、インポート時に一度だけ構築する
+# https://docs.pydantic.dev/latest/concepts/type_adapter/
+_movies_adapter = TypeAdapter(list[MovieResponse])
+
+
+def _cache_key_builder(func, namespace="", *, request=None, response=None, args=(), kwargs=None):
+    """リクエストパスのみからキャッシュキーを組み立てるkey_builder
+
+    デフォルトのkey_builderはエンドポイント引数のreprをハッシュするが、
+    引数にはリクエスト毎のSessionオブジェクトが含まれるため、キーが
+    メモリアドレス依存となりヒットが不安定になる。パスのみなら決定的になる
+    """
+    path = request.url.path if request is not None else func.__name__
+    return f"{namespace}:{path}"
+
+
+@router.get("", responses={200: {"model": list[MovieResponse]}})
+@cache(expire=300, namespace="movies", key_builder=_cache_key_builder)
+def read_movies(db=Depends(get_db)):
+    # 同期SQLAlchemyを使うため、async defにするとDBアクセス中イベントループをブロックしてしまう
+    # 通常のdefにすることでFastAPIがスレッドプールで実行する
+    # https://fastapi.tiangolo.com/async/#path-operation-functions
     repository = MovieRepository(session=db)
-    movies = repository.find_all()
-    return movies
\ No newline at end of file
+    # 読み取り専用のレスポンス用途ではORMインスタンス化・識別マップ登録の
+    # オーバーヘッドが不要なため、Core selectベースの取得を使う
+    movies = repository.find_all_movies_flat()
+    validated = _movies_adapter.validate_python(movies, from_attributes=True)
+    return ORJSONResponse(content=_movies_adapter.dump_python(validated, mode="json"))
+
+
+POSTER_DIR = pathlib.Path(os.environ.get("POSTER_DIR", "./posters"))
+
+
+@router.get("/{movie_id}/poster")
+def read_movie_poster(movie_id: str, db=Depends(get_db)):
+    # バイナリをPython側へ読み込まず、FileResponseでファイルをそのまま送信する
+    # (ASGIサーバが対応していればsendfileによるゼロコピー送信になる)
+    poster_id = MovieRepository(session=db).find_poster_id(movie_id=movie_id)
+    if poster_id is None:
+        raise HTTPException(status_code=404, detail="Movie not found.")
+
+    poster_repository = PosterRepository(session=PosterFileStorageSession(base_dir=POSTER_DIR))
+    filepath = poster_repository.find_path_by_id(id=poster_id)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="Poster not found.")
+
+    return FileResponse(path=filepath, media_type="image/jpeg")
\ No newline at end of file
@@ -13,7 +13,7 @@ class ActorCreate(ActorBase):
 class ActorResponse(ActorBase):
     id: str
 
-    model_config: ConfigDict = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
 class DirectorBase(BaseModel):
     name: str
@@ -24,7 +24,7 @@ class DirectorCreate(BaseModel):
 class DirectorResponse(DirectorBase):
     id: str
     
-    model_config: ConfigDict = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
 class CountryOfProductionBase(BaseModel):
     name: str
@@ -35,7 +35,7 @@ class CountryOfProductionCreate(CountryOfProductionBase):
 class CountryOfProductionResponse(CountryOfProductionBase):
     id: str
     
-    model_config: ConfigDict = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
 class GenreBase(BaseModel):
     name: str
@@ -46,7 +46,7 @@ class GenreCreate(GenreBase):
 class GenreResponse(GenreBase):
     id: str
     
-    model_config: ConfigDict = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
 class MovieBase(BaseModel):
     title: str
@@ -68,6 +68,6 @@ class MovieResponse(MovieBase):
     directors: list[DirectorResponse]
     genres: list[GenreResponse]
     
-    model_config: ConfigDict = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
     
\ No newline at end of file
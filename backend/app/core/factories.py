@@ -12,7 +12,8 @@ from app.core.entities import (
 )
 
 def _generate_uuid():
-    return str(uuid.uuid4())
+    # str(uuid4())はハイフン区切りへの整形が入るため、C実装の属性参照で済む.hexを使う
+    return uuid.uuid4().hex
 
 def create_actor(name: str) -> Actor:
     """Create an actor.
@@ -67,10 +68,11 @@ def create_poster(byte: bytes) -> Poster:
     Returns:
         Poster: a poster
     """
-    unique_id = str(uuid.uuid4())
-    filename = hashlib.sha256(unique_id.encode()).hexdigest()
-    
-    return Poster(id=_generate_uuid(), binary=byte, filename=filename)
+    poster_id = _generate_uuid()
+    # ポスターIDからファイル名を再計算できるようにIDのハッシュ値をファイル名とする
+    filename = hashlib.sha256(poster_id.encode()).hexdigest()
+
+    return Poster(id=poster_id, binary=byte, filename=filename)
 
 def create_movie(
     title: str, 
@@ -80,7 +82,7 @@ def create_movie(
     genres: list[Genre], 
     actors: list[Actor], 
     directors: list[Director],
-    poster: Poster
+    poster: Poster | None = None
     ) -> Movie:
     """Create a movie.
 
@@ -92,11 +94,17 @@ def create_movie(
         genres (list[Genre]): genres of the movie
         actors (list[Actor]): actors of the movie
         directors (list[Director]): directors of the movie
-        poster (Poster): poster of the movie
+        poster (Poster | None): poster of the movie. If omitted, a placeholder
+            holding only a newly generated id is used.
 
     Returns:
         Movie: a movie
     """
+    # DBに保存されるのはposter_idのみのため、未指定時はIDだけ採番した
+    # プレースホルダを使う(読み出し側もbinary/filenameなしで構築している)
+    if poster is None:
+        poster = Poster(id=_generate_uuid(), binary=None, filename=None)
+
     return Movie(
         id=_generate_uuid(),
         title=title,
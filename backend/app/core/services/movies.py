@@ -1,3 +1,4 @@
+import dataclasses
 from datetime import date
 
 from app.core.entities import Movie
@@ -18,37 +19,14 @@ class MovieService:
         self.movie_repository.add(movie)
         
     def find_all(self):
-        movies = self.movie_repository.find_all()
-        posters = [self.poster_repository.find_by_id(movie_id=movie.poster.id) for movie in movies]
-        
-        # Movieオブジェクトは、プロパティの値を変更できないため、新しいMovieオブジェクトを作成する
-        return [
-            Movie(
-                id=movie.id, 
-                title=movie.title, 
-                description=movie.description, 
-                published_date=movie.published_date, 
-                directors=movie.directors, 
-                actors=movie.actors, 
-                genres=movie.genres, 
-                country_of_production=movie.country_of_production, 
-                poster=poster
-            ) for movie, poster in zip(movies, posters)
-        ]
+        # 一覧のレスポンス(MovieResponse)はポスターを返さないため、
+        # ここでポスターのバイナリを読み込むのは無駄になる
+        # ポスターが必要な場合はfind_by_title_and_yearか専用エンドポイントで取得する
+        return self.movie_repository.find_all()
 
     def find_by_title_and_year(self, title: str, published_date: date) -> Movie:
         movie = self.movie_repository.find_by_title_and_year(title=title, published_date=published_date)
-        poster = self.poster_repository.find_by_id(movie_id=movie.poster.id)
-        
-        # Movieオブジェクトは、プロパティの値を変更できないため、新しいMovieオブジェクトを作成する
-        return Movie(
-                    id=movie.id, 
-                    title=movie.title, 
-                    description=movie.description, 
-                    published_date=movie.published_date, 
-                    directors=movie.directors, 
-                    actors=movie.actors, 
-                    genres=movie.genres, 
-                    country_of_production=movie.country_of_production, 
-                    poster=poster
-                )
\ No newline at end of file
+        poster = self.poster_repository.find_by_id(id=movie.poster.id)
+
+        # Movieは不変のため、ポスターのみ差し替えたコピーを作成する
+        return dataclasses.replace(movie, poster=poster)
\ No newline at end of file
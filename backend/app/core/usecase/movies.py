@@ -47,36 +47,40 @@ class MovieUseCase:
         if self.movie_repository.find_by_title_and_year(title=movie_create.title, published_date=movie_create.published_date):
             raise MovieAlreadyExistError("The movie already exists.")
         
-        actors = []
-        for actor in movie_create.actors:
-            # 俳優を名前で検索
-            existing_actor = self.actor_repository.find_by_name(name=actor.name)
-            
-            if existing_actor:
-                actors.append(existing_actor)
-            else:
-                # 新しい俳優を作成してリポジトリに追加
-                new_actor = create_actor(name=actor.name)
-                actors.append(new_actor)
-        
-        directors = []
-        for director in movie_create.directors:
-            existing_director = self.director_repository.find_by_name(name=director.name)
-            if existing_director:
-                directors.append(existing_director)
-            else:
-                new_director = create_director(name=director.name)
-                directors.append(new_director)
-        
+        # 名前ごとに1クエリ発行するのではなく、IN句でまとめて検索する
+        # ペイロード内の重複名はdict.fromkeysで順序を保ったまま除去する
+        actor_names = list(dict.fromkeys(actor.name for actor in movie_create.actors))
+        existing_actors = self.actor_repository.find_by_names(names=actor_names)
+        new_actors = [
+            create_actor(name=name)
+            for name in actor_names if name not in existing_actors
+        ]
+        actors = list(existing_actors.values()) + new_actors
+
+        director_names = list(dict.fromkeys(director.name for director in movie_create.directors))
+        existing_directors = self.director_repository.find_by_names(names=director_names)
+        new_directors = [
+            create_director(name=name)
+            for name in director_names if name not in existing_directors
+        ]
+        directors = list(existing_directors.values()) + new_directors
+
+        # 新規の俳優・監督はまとめて1回のマルチローINSERTで登録する
+        if new_actors:
+            self.actor_repository.add_all(new_actors)
+        if new_directors:
+            self.director_repository.add_all(new_directors)
+
+        genre_names = list(dict.fromkeys(genre.name for genre in movie_create.genres))
+        existing_genres = self.genre_repository.find_by_names(names=genre_names)
         genres = []
-        for genre in movie_create.genres:
-            existing_genre = self.genre_repository.find_by_name(name=genre.name)
+        for name in genre_names:
+            existing_genre = existing_genres.get(name)
             # NOTE: 登録されているジャンルのみ登録可能とする仕様
-            if existing_genre:
-                genres.append(existing_genre)
-            else:
+            if existing_genre is None:
                 all_genres = self.genre_repository.find_all()
-                raise InvalidGenreError(f"Invalid genre: {genre.name}. Available genres are {', '.join([genre.name for genre in all_genres])}")
+                raise InvalidGenreError(f"Invalid genre: {name}. Available genres are {', '.join([genre.name for genre in all_genres])}")
+            genres.append(existing_genre)
         
         country_of_production = self.country_of_production_repository.find_by_name(name=movie_create.country_of_production.name)
         if country_of_production is None:
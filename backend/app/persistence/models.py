@@ -40,7 +40,7 @@ class ActorModel(Base,TimestampMixin):
     movies: Mapped[list["MovieModel"]] = relationship(
         secondary="movie_to_actor",
         back_populates="actors",
-        lazy="joined"
+        lazy="selectin"
     )
 
     def __repr__(self):
@@ -62,7 +62,7 @@ class DirectorModel(Base,TimestampMixin):
     movies: Mapped[list["MovieModel"]] = relationship(
         secondary="movie_to_director",
         back_populates="directors",
-        lazy="joined"
+        lazy="selectin"
     )
 
     def __repr__(self):
@@ -104,7 +104,7 @@ class GenreModel(Base,TimestampMixin):
     movies: Mapped[list["MovieModel"]] = relationship(
         secondary="movie_to_genre",
         back_populates="genres",
-        lazy="joined"
+        lazy="selectin"
     )
 
     def __repr__(self):
@@ -138,19 +138,19 @@ class MovieModel(Base,TimestampMixin):
     genres: Mapped[list["GenreModel"]] = relationship(
         secondary="movie_to_genre",
         back_populates="movies",
-        lazy="joined"
+        lazy="selectin"
     )
 
     actors: Mapped[list["ActorModel"]] = relationship(
         secondary="movie_to_actor",
         back_populates="movies",
-        lazy="joined"
+        lazy="selectin"
     )
     
     directors: Mapped[list["DirectorModel"]] = relationship(
         secondary="movie_to_director",
         back_populates="movies",
-        lazy="joined"
+        lazy="selectin"
     )
     
     def __repr__(self):
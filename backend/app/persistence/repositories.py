@@ -1,9 +1,16 @@
 import datetime
+import functools
+import hashlib
+import itertools
+import mmap
 import pathlib
-import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, load_only, raiseload, selectinload
 
 from app.core.entities import (
     Actor,
@@ -20,12 +27,185 @@ from app.persistence.models import (
     DirectorModel,
     GenreModel,
     MovieModel,
+    movie_to_actor,
+    movie_to_director,
+    movie_to_genre,
 )
 
 
+# 名前検索はホットパスのため、呼び出しごとにselect式を組み立て直さず
+# bindparam入りの文をインポート時に一度だけ構築して使い回す
+# https://docs.sqlalchemy.org/en/20/core/connections.html#sql-compilation-caching
+# 利用側はid/nameしか読まないため、load_onlyで必要カラムのみ取得する
+# (将来テーブルへカラムが増えても不要なデータを転送しない)
+_STMT_ACTOR_BY_NAME = select(ActorModel).where(ActorModel.name == bindparam("name")).options(
+            load_only(ActorModel.id, ActorModel.name), raiseload("*"))
+_STMT_DIRECTOR_BY_NAME = select(DirectorModel).where(DirectorModel.name == bindparam("name")).options(
+            load_only(DirectorModel.id, DirectorModel.name), raiseload("*"))
+_STMT_COUNTRY_BY_NAME = select(CountryOfProductionModel).where(CountryOfProductionModel.name == bindparam("name")).options(
+            load_only(CountryOfProductionModel.id, CountryOfProductionModel.name), raiseload("*"))
+_STMT_GENRE_BY_NAME = select(GenreModel).where(GenreModel.name == bindparam("name")).options(
+            load_only(GenreModel.id, GenreModel.name), raiseload("*"))
+
+# Movie検索で共通のローダ設定:
+# - 必要カラムのみload_onlyで取得する
+# - コレクションは直積を避けるためselectinload、多対1の製作国はjoinedloadで読み込む
+# - raiseload("*")で意図しない遅延ロード(N+1)を即座に失敗させる
+_MOVIE_LOAD_OPTIONS = (
+    load_only(
+        MovieModel.id,
+        MovieModel.title,
+        MovieModel.description,
+        MovieModel.published_date,
+        MovieModel.poster_id,
+    ),
+    selectinload(MovieModel.genres).load_only(GenreModel.id, GenreModel.name),
+    selectinload(MovieModel.actors).load_only(ActorModel.id, ActorModel.name),
+    selectinload(MovieModel.directors).load_only(DirectorModel.id, DirectorModel.name),
+    joinedload(MovieModel.country_of_production).load_only(CountryOfProductionModel.id, CountryOfProductionModel.name),
+    raiseload("*"),
+)
+
+_STMT_MOVIE_BY_TITLE_AND_YEAR = select(MovieModel).where(
+            MovieModel.title == bindparam("title"),
+            MovieModel.published_date == bindparam("published_date")
+        ).options(*_MOVIE_LOAD_OPTIONS)
+
+
+# 接続中の方言に応じたINSERT ... ON CONFLICT DO NOTHING構築関数
+# (DATABASE_URLでPostgreSQLも選択できるため、sqlite専用にしない)
+_INSERT_IGNORE_BUILDERS = {
+    "sqlite": sqlite_insert,
+    "postgresql": pg_insert,
+}
+
+
+# ドメインモデル⇔ORMモデルの対応表
+# 各リポジトリにほぼ同一実装で重複していた変換ヘルパーを1つの汎用変換に集約する
+_ENTITY_TO_MODEL_CLASS = {
+    Actor: ActorModel,
+    Director: DirectorModel,
+    Genre: GenreModel,
+    CountryOfProduction: CountryOfProductionModel,
+}
+_MODEL_TO_ENTITY_CLASS = {model_cls: entity_cls for entity_cls, model_cls in _ENTITY_TO_MODEL_CLASS.items()}
+
+
+def _entity_to_model(entity):
+    """Domain model to ORM model
+
+    Args:
+        entity: id/nameを持つドメインモデル
+            (Actor/Director/Genre/CountryOfProduction)
+
+    Returns:
+        対応するORM model
+    """
+    return _ENTITY_TO_MODEL_CLASS[type(entity)](id=entity.id, name=entity.name)
+
+
+def _model_to_entity(model):
+    """ORM model to Domain model
+
+    Args:
+        model: id/nameを持つORM model
+            (ActorModel/DirectorModel/GenreModel/CountryOfProductionModel)
+
+    Returns:
+        対応するドメインモデル
+    """
+    return _MODEL_TO_ENTITY_CLASS[type(model)](id=model.id, name=model.name)
+
+
+def _interned(cache: dict, entity_cls, model):
+    """idをキーにエンティティをフライウェイトとして共有する
+
+    同一レスポンス内で繰り返し登場する俳優・監督などを
+    出現のたびに構築し直さず、1インスタンスを使い回す
+
+    Args:
+        cache (dict): id -> エンティティの共有キャッシュ
+        entity_cls: 構築するドメインモデルのクラス
+        model: id/name属性を持つORM model
+
+    Returns:
+        共有されたドメインモデル
+    """
+    entity = cache.get(model.id)
+    if entity is None:
+        entity = entity_cls(id=model.id, name=model.name)
+        cache[model.id] = entity
+    return entity
+
+
+def _movie_model_to_entity(movie_model: MovieModel, cache: dict | None = None) -> Movie:
+    """ORM model to Domain model
+
+    各リポジトリで重複していたMovie構築処理の共通ヘルパー
+
+    Args:
+        movie_model (MovieModel): ORM model
+        cache (dict | None): 複数のMovieを変換する際に俳優・監督・ジャンル・製作国を
+            共有するためのキャッシュ。Noneの場合は共有しない
+
+    Returns:
+        Movie: Domain model
+    """
+    if cache is None:
+        cache = {}
+
+    return Movie(
+                id=movie_model.id,
+                title=movie_model.title,
+                description=movie_model.description,
+                published_date=movie_model.published_date,
+                country_of_production=_interned(cache, CountryOfProduction, movie_model.country_of_production),
+                genres=[
+                    _interned(cache, Genre, genre)
+                    for genre in movie_model.genres
+                ],
+                directors=[
+                    _interned(cache, Director, director)
+                    for director in movie_model.directors
+                ],
+                actors=[
+                    _interned(cache, Actor, actor)
+                    for actor in movie_model.actors
+                ],
+                poster=Poster(
+                    id=movie_model.poster_id,
+                    binary=None,
+                    filename=None
+                )
+            )
+
+
+class _LazyActorList:
+    """俳優一覧の遅延プロキシ
+
+    find_allが全件のドメインモデルを先に構築するのではなく、
+    イテレートで消費された行の分だけ構築する
+    """
+    def __init__(self, session: Session):
+        self._session = session
+
+    def __len__(self) -> int:
+        # 件数のみ必要な場合に全行をロードしないよう、COUNT(*)で取得する
+        return self._session.scalar(select(func.count()).select_from(ActorModel))
+
+    def __iter__(self):
+        rows = self._session.execute(
+            select(ActorModel.id, ActorModel.name).execution_options(yield_per=500)
+        )
+        for actor_id, actor_name in rows:
+            yield Actor(id=actor_id, name=actor_name)
+
+
 class ActorRepository:
     def __init__(self, session: Session):
         self.session = session
+        # リポジトリインスタンスの寿命(=リクエスト)内で同名ルックアップをメモ化する
+        self._name_cache: dict[str, Actor | None] = {}
         
     def add(self, actor: Actor):
         """Add an actor to the database
@@ -33,20 +213,30 @@ class ActorRepository:
         Args:
             actor (Actor): Domain model
         """
-        actor_model = self._entity_to_model(actor_entity=actor)
+        actor_model = _entity_to_model(entity=actor)
         self.session.add(actor_model)
-    
-    def find_all(self):
+        self._name_cache.pop(actor.name, None)
+
+    def add_all(self, actors: list[Actor]):
+        """Add actors to the database in a single multi-row INSERT
+
+        Args:
+            actors (list[Actor]): Domain models
+        """
+        self.session.add_all([_entity_to_model(entity=actor) for actor in actors])
+        self.session.flush()
+        for actor in actors:
+            self._name_cache.pop(actor.name, None)
+
+    def find_all(self) -> "_LazyActorList":
         """Find all actors in the database
+
+        Returns:
+            _LazyActorList: a lazy iterable of actors
+                イテレートされた行の分だけドメインモデルを構築する
         """
-        stmt = select(ActorModel)
-        actor_models = self.session.scalars(stmt).unique().all()
-        
-        return [
-                    self._model_to_entity(actor_model=actor_model)
-                    for actor_model in actor_models
-                ]
-    
+        return _LazyActorList(session=self.session)
+
     def find_by_name(self, name: str) -> Actor | None:
         """Find an actor by name in the database
 
@@ -57,14 +247,37 @@ class ActorRepository:
             Actor | None: an actor or None
                 "None" is returned if the actor is not found
         """
-        stmt = select(ActorModel).where(ActorModel.name == name)
-        actor_model = self.session.scalars(stmt).first()
+        if name in self._name_cache:
+            return self._name_cache[name]
+
+        actor_model = self.session.scalars(_STMT_ACTOR_BY_NAME, {"name": name}).first()
         
         if actor_model is None:
+            self._name_cache[name] = None
             return None
         
-        return self._model_to_entity(actor_model=actor_model)
-    
+        actor = _model_to_entity(model=actor_model)
+        self._name_cache[name] = actor
+        return actor
+
+    def find_by_names(self, names: list[str]) -> dict[str, Actor]:
+        """Find actors by names in the database
+
+        Args:
+            names (list[str]): names of the actors
+
+        Returns:
+            dict[str, Actor]: actors keyed by name
+                Names that are not found are not included
+        """
+        stmt = select(ActorModel).where(ActorModel.name.in_(names)).options(raiseload("*"))
+        actor_models = self.session.scalars(stmt).unique().all()
+
+        return {
+                    actor_model.name: _model_to_entity(model=actor_model)
+                    for actor_model in actor_models
+                }
+
     def find_movies_by_actor_name(self, name: str) -> list[Movie] | None:
         """Find movies by actor name in the database
 
@@ -74,80 +287,33 @@ class ActorRepository:
         Returns:
             list[Movie] | None: Domain model
         """
-        stmt = select(ActorModel).where(ActorModel.name == name)
-        actor_model = self.session.scalars(stmt).first()
-        
-        if actor_model is None:
+        # 返却しないActorModel本体や関連コレクションのプロキシを構築しないよう、
+        # idのみ取得してから中間テーブル経由でMovieModelを直接検索する
+        actor_id = self.session.scalars(select(ActorModel.id).where(ActorModel.name == name)).first()
+
+        if actor_id is None:
             return None
-        
+
+        # 関連の遅延ロードによるN+1を避けるため、movie配下の関連までまとめて読み込む
+        stmt = select(MovieModel).join(
+                    movie_to_actor, movie_to_actor.c.movie_id == MovieModel.id
+                ).where(movie_to_actor.c.actor_id == actor_id).options(*_MOVIE_LOAD_OPTIONS)
+        movie_models = self.session.scalars(stmt).all()
+
+        # レスポンス内で重複する俳優・監督などを1インスタンスに共有する
+        entity_cache: dict = {}
         movies = [
-                    Movie(
-                        id=movie.id,
-                        title=movie.title,
-                        description=movie.description,
-                        published_date=movie.published_date,
-                        country_of_production=CountryOfProduction(
-                            id=movie.country_of_production.id,
-                            name=movie.country_of_production.name
-                        ),
-                        genres=[
-                            Genre(
-                                id=genre.id,
-                                name=genre.name
-                            )
-                            for genre in movie.genres
-                        ],
-                        directors=[
-                            Director(
-                                id=director.id,
-                                name=director.name
-                            )
-                            for director in movie.directors
-                        ],
-                        actors=[
-                            Actor(
-                                id=actor.id,
-                                name=actor.name
-                            )
-                            for actor in movie.actors
-                        ]
-                    )
-                    for movie in actor_model.movies
+                    _movie_model_to_entity(movie_model=movie, cache=entity_cache)
+                    for movie in movie_models
                 ]
         return movies
 
     
-    def _entity_to_model(self, actor_entity: Actor) -> ActorModel:
-        """Domain model to ORM model
-
-        Args:
-            actor_entity (Actor): Domain model
-
-        Returns:
-            ActorModel: ORM model
-        """
-        return ActorModel(
-                    id=actor_entity.id,
-                    name=actor_entity.name
-                )
-    
-    def _model_to_entity(self, actor_model: ActorModel) -> Actor:
-        """ORM model to Domain model
-
-        Args:
-            actor_model (ActorModel): ORM model
-
-        Returns:
-            Actor: Domain model
-        """
-        return Actor(
-                    id=actor_model.id,
-                    name=actor_model.name
-                )
-
 class DirectorRepository:
     def __init__(self, session: Session):
         self.session = session
+        # リポジトリインスタンスの寿命(=リクエスト)内で同名ルックアップをメモ化する
+        self._name_cache: dict[str, Director | None] = {}
     
     def add(self, director: Director):
         """Add a director to the database
@@ -155,9 +321,21 @@ class DirectorRepository:
         Args:
             director (Director): Domain model
         """
-        director_model = self._entity_to_model(director_entity=director)
+        director_model = _entity_to_model(entity=director)
         self.session.add(director_model)
-    
+        self._name_cache.pop(director.name, None)
+
+    def add_all(self, directors: list[Director]):
+        """Add directors to the database in a single multi-row INSERT
+
+        Args:
+            directors (list[Director]): Domain models
+        """
+        self.session.add_all([_entity_to_model(entity=director) for director in directors])
+        self.session.flush()
+        for director in directors:
+            self._name_cache.pop(director.name, None)
+
     def find_by_name(self, name: str) -> Director | None:
         """Find a director by name in the database
 
@@ -168,14 +346,37 @@ class DirectorRepository:
             Director | None: a director or None
                 "None" is returned if the director is not found
         """
-        stmt = select(DirectorModel).where(DirectorModel.name == name)
-        director_model = self.session.scalars(stmt).first()
+        if name in self._name_cache:
+            return self._name_cache[name]
+
+        director_model = self.session.scalars(_STMT_DIRECTOR_BY_NAME, {"name": name}).first()
         
         if director_model is None:
+            self._name_cache[name] = None
             return None
         
-        return self._model_to_entity(director_model=director_model)
-    
+        director = _model_to_entity(model=director_model)
+        self._name_cache[name] = director
+        return director
+
+    def find_by_names(self, names: list[str]) -> dict[str, Director]:
+        """Find directors by names in the database
+
+        Args:
+            names (list[str]): names of the directors
+
+        Returns:
+            dict[str, Director]: directors keyed by name
+                Names that are not found are not included
+        """
+        stmt = select(DirectorModel).where(DirectorModel.name.in_(names)).options(raiseload("*"))
+        director_models = self.session.scalars(stmt).unique().all()
+
+        return {
+                    director_model.name: _model_to_entity(model=director_model)
+                    for director_model in director_models
+                }
+
     def find_movies_by_director_name(self, name: str) -> list[Movie] | None:
         """Find movies by director name in the database
 
@@ -186,80 +387,32 @@ class DirectorRepository:
             list[Movie] | None: a list of movies or None
                 "None" is returned if the director is not found
         """
-        stmt = select(DirectorModel).where(DirectorModel.name == name)
-        director_model = self.session.scalars(stmt).first()
-        
-        if director_model is None:
+        # 返却しないDirectorModel本体や関連コレクションのプロキシを構築しないよう、
+        # idのみ取得してから中間テーブル経由でMovieModelを直接検索する
+        director_id = self.session.scalars(select(DirectorModel.id).where(DirectorModel.name == name)).first()
+
+        if director_id is None:
             return None
-        
+
+        # 関連の遅延ロードによるN+1を避けるため、movie配下の関連までまとめて読み込む
+        stmt = select(MovieModel).join(
+                    movie_to_director, movie_to_director.c.movie_id == MovieModel.id
+                ).where(movie_to_director.c.director_id == director_id).options(*_MOVIE_LOAD_OPTIONS)
+        movie_models = self.session.scalars(stmt).all()
+
+        # レスポンス内で重複する俳優・監督などを1インスタンスに共有する
+        entity_cache: dict = {}
         movies = [
-                    Movie(
-                        id=movie.id,
-                        title=movie.title,
-                        description=movie.description,
-                        published_date=movie.published_date,
-                        country_of_production=CountryOfProduction(
-                            id=movie.country_of_production.id,
-                            name=movie.country_of_production.name
-                        ),
-                        genres=[
-                            Genre(
-                                id=genre.id,
-                                name=genre.name
-                            )
-                            for genre in movie.genres
-                        ],
-                        directors=[
-                            Director(
-                                id=director.id,
-                                name=director.name
-                            )
-                            for director in movie.directors
-                        ],
-                        actors=[
-                            Actor(
-                                id=actor.id,
-                                name=actor.name
-                            )
-                            for actor in movie.actors
-                        ]
-                    )
-                    for movie in director_model.movies
+                    _movie_model_to_entity(movie_model=movie, cache=entity_cache)
+                    for movie in movie_models
                 ]
         return movies
     
-    def _entity_to_model(self, director_entity: Director) -> DirectorModel:
-        """Domain model to ORM model
-
-        Args:
-            director_entity (Director): Domain model
-
-        Returns:
-            DirectorModel: ORM model
-        """
-        return DirectorModel(
-                    id=director_entity.id,
-                    name=director_entity.name
-                )
-    
-    def _model_to_entity(self, director_model: DirectorModel) -> Director:
-        """ORM model to Domain model
-
-        Args:
-            director_model (DirectorModel): ORM model
-
-        Returns:
-            Director: Domain model
-        """
-        return Director(
-                    id=director_model.id,
-                    name=director_model.name
-                )
-
-
 class CountryOfProductionRepository:
     def __init__(self, session: Session):
         self.session = session
+        # リポジトリインスタンスの寿命(=リクエスト)内で同名ルックアップをメモ化する
+        self._name_cache: dict[str, CountryOfProduction | None] = {}
     
     def add(self, country_of_production: CountryOfProduction):
         """Add a country of production to the database
@@ -267,8 +420,9 @@ class CountryOfProductionRepository:
         Args:
             country_of_production (CountryOfProduction): Domain model
         """
-        country_of_production_model = self._entity_to_model(country_of_production_entity=country_of_production)
+        country_of_production_model = _entity_to_model(entity=country_of_production)
         self.session.add(country_of_production_model)
+        self._name_cache.pop(country_of_production.name, None)
     
     def find_all(self) -> list[CountryOfProduction]:
         """Find all countries of production in the database
@@ -276,11 +430,11 @@ class CountryOfProductionRepository:
         Returns:
             list[CountryOfProduction]: a list of countries of production
         """
-        stmt = select(CountryOfProductionModel)
-        country_of_production_models = self.session.scalars(stmt).unique().all()
+        stmt = select(CountryOfProductionModel).options(raiseload("*"))
+        country_of_production_models = self.session.scalars(stmt.execution_options(yield_per=500))
         
         return [
-                    self._model_to_entity(country_of_production_model=country_of_production_model)
+                    _model_to_entity(model=country_of_production_model)
                     for country_of_production_model in country_of_production_models
                 ]
     
@@ -294,46 +448,24 @@ class CountryOfProductionRepository:
             CountryOfProduction | None: a country of production or None
                 "None" is returned if the country of production is not found
         """
-        stmt = select(CountryOfProductionModel).where(CountryOfProductionModel.name == name)
-        country_of_production_model = self.session.scalars(stmt).first()
+        if name in self._name_cache:
+            return self._name_cache[name]
+
+        country_of_production_model = self.session.scalars(_STMT_COUNTRY_BY_NAME, {"name": name}).first()
         
         if country_of_production_model is None:
+            self._name_cache[name] = None
             return None
         
-        return self._model_to_entity(country_of_production_model=country_of_production_model)
+        country_of_production = _model_to_entity(model=country_of_production_model)
+        self._name_cache[name] = country_of_production
+        return country_of_production
     
-    def _entity_to_model(self, country_of_production_entity: CountryOfProduction) -> CountryOfProductionModel:
-        """Domain model to ORM model
-
-        Args:
-            country_of_production_entity (CountryOfProduction): Domain model
-
-        Returns:
-            CountryOfProductionModel: ORM model
-        """
-        return CountryOfProductionModel(
-                    id=country_of_production_entity.id,
-                    name=country_of_production_entity.name
-                )
-    
-    def _model_to_entity(self, country_of_production_model: CountryOfProductionModel) -> CountryOfProduction:
-        """ORM model to Domain model
-
-        Args:
-            country_of_production_model (CountryOfProductionModel): ORM model
-
-        Returns:
-            CountryOfProduction: Domain model
-        """
-        return CountryOfProduction(
-                    id=country_of_production_model.id,
-                    name=country_of_production_model.name
-                )
-
-
 class GenreRepository:
     def __init__(self, session: Session):
         self.session = session
+        # リポジトリインスタンスの寿命(=リクエスト)内で同名ルックアップをメモ化する
+        self._name_cache: dict[str, Genre | None] = {}
     
     def add(self, genre: Genre):
         """Add a genre to the database
@@ -341,8 +473,9 @@ class GenreRepository:
         Args:
             genre (Genre): Domain model
         """
-        genre_model = self._entity_to_model(genre_entity=genre)
+        genre_model = _entity_to_model(entity=genre)
         self.session.add(genre_model)
+        self._name_cache.pop(genre.name, None)
     
     def find_all(self) -> list[Genre]:
         """Find all genres in the database
@@ -350,11 +483,11 @@ class GenreRepository:
         Returns:
             list[Genre]: a list of genres
         """
-        stmt = select(GenreModel)
-        genre_models = self.session.scalars(stmt).unique().all()
+        stmt = select(GenreModel).options(raiseload("*"))
+        genre_models = self.session.scalars(stmt.execution_options(yield_per=500))
         
         return [
-                    self._model_to_entity(genre_model=genre_model)
+                    _model_to_entity(model=genre_model)
                     for genre_model in genre_models
         ]
     
@@ -368,14 +501,37 @@ class GenreRepository:
             Genre | None: a genre or None
                 "None" is returned if the genre is not found
         """
-        stmt = select(GenreModel).where(GenreModel.name == name)
-        genre_model = self.session.scalars(stmt).first()
+        if name in self._name_cache:
+            return self._name_cache[name]
+
+        genre_model = self.session.scalars(_STMT_GENRE_BY_NAME, {"name": name}).first()
         
         if genre_model is None:
+            self._name_cache[name] = None
             return None
         
-        return self._model_to_entity(genre_model=genre_model)
-    
+        genre = _model_to_entity(model=genre_model)
+        self._name_cache[name] = genre
+        return genre
+
+    def find_by_names(self, names: list[str]) -> dict[str, Genre]:
+        """Find genres by names in the database
+
+        Args:
+            names (list[str]): names of the genres
+
+        Returns:
+            dict[str, Genre]: genres keyed by name
+                Names that are not found are not included
+        """
+        stmt = select(GenreModel).where(GenreModel.name.in_(names)).options(raiseload("*"))
+        genre_models = self.session.scalars(stmt).unique().all()
+
+        return {
+                    genre_model.name: _model_to_entity(model=genre_model)
+                    for genre_model in genre_models
+                }
+
     def find_movies_by_genre_name(self, name: str) -> list[Movie] | None:
         """Find movies by genre name in the database
 
@@ -386,77 +542,27 @@ class GenreRepository:
             list[Movie] | None: a list of movies or None
                 "None" is returned if the genre is not found
         """
-        stmt = select(GenreModel).where(GenreModel.name == name)
-        genre_model = self.session.scalars(stmt).first()
-        
-        if genre_model is None:
+        # 返却しないGenreModel本体や関連コレクションのプロキシを構築しないよう、
+        # idのみ取得してから中間テーブル経由でMovieModelを直接検索する
+        genre_id = self.session.scalars(select(GenreModel.id).where(GenreModel.name == name)).first()
+
+        if genre_id is None:
             return None
-        
+
+        # 関連の遅延ロードによるN+1を避けるため、movie配下の関連までまとめて読み込む
+        stmt = select(MovieModel).join(
+                    movie_to_genre, movie_to_genre.c.movie_id == MovieModel.id
+                ).where(movie_to_genre.c.genre_id == genre_id).options(*_MOVIE_LOAD_OPTIONS)
+        movie_models = self.session.scalars(stmt).all()
+
+        # レスポンス内で重複する俳優・監督などを1インスタンスに共有する
+        entity_cache: dict = {}
         movies = [
-                    Movie(
-                        id=movie.id,
-                        title=movie.title,
-                        description=movie.description,
-                        published_date=movie.published_date,
-                        country_of_production=CountryOfProduction(
-                            id=movie.country_of_production.id,
-                            name=movie.country_of_production.name
-                        ),
-                        genres=[
-                            Genre(
-                                id=genre.id,
-                                name=genre.name
-                            )
-                            for genre in movie.genres
-                        ],
-                        directors=[
-                            Director(
-                                id=director.id,
-                                name=director.name
-                            )
-                            for director in movie.directors
-                        ],
-                        actors=[
-                            Actor(
-                                id=actor.id,
-                                name=actor.name
-                            )
-                            for actor in movie.actors
-                        ]
-                    )
-                    for movie in genre_model.movies
+                    _movie_model_to_entity(movie_model=movie, cache=entity_cache)
+                    for movie in movie_models
                 ]
         return movies
     
-    def _entity_to_model(self, genre_entity: Genre) -> GenreModel:
-        """Domain model to ORM model
-
-        Args:
-            genre_entity (Genre): Domain model
-
-        Returns:
-            GenreModel: ORM model
-        """
-        return GenreModel(
-                    id=genre_entity.id,
-                    name=genre_entity.name
-                )
-    
-    def _model_to_entity(self, genre_model: GenreModel) -> Genre:
-        """ORM model to Domain model
-
-        Args:
-            genre_model (GenreModel): ORM model
-
-        Returns:
-            Genre: Domain model
-        """
-        return Genre(
-                    id=genre_model.id,
-                    name=genre_model.name
-                )
-
-
 class MovieRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -474,31 +580,68 @@ class MovieRepository:
             directors (list[Director]): Domain model
         """
         movie_model = self._entity_to_model_movie(movie_entity=movie)
-        actors = [self._entity_to_model_actor(actor) for actor in movie.actors]
-        directors = [self._entity_to_model_director(director) for director in movie.directors]
-        genres = [self._entity_to_model_genre(genre) for genre in movie.genres]
-        country_of_production = self._entity_to_model_country(movie.country_of_production)
-        
+
         # ------------------
-        # ドメインモデルをORMモデルに変換
-        # https://docs.sqlalchemy.org/en/20/orm/session_state_management.html#merging
-        # https://docs.sqlalchemy.org/en/20/orm/session_api.html#sqlalchemy.orm.Session.merge
+        # merge()は1件ごとにSELECT+INSERT/UPDATEの往復が発生するため、
+        # 既存行を無視するINSERT(INSERT OR IGNORE)で関連エンティティを種類ごとに一括登録する
+        # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#insert-on-conflict-upsert
         # ------------------
-        actors = [self.session.merge(actor) for actor in actors]
-        directors = [self.session.merge(director) for director in directors]
-        genres = [self.session.merge(genre) for genre in genres]
-        country_of_production = self.session.merge(country_of_production)
-        poster = self.session.merge(poster)
-        
-        # movie_modelに関連するactor, director, genre, country_of_productionを設定
-        # これにより、movie_modelをsessionに追加すると、actor, director, genre, country_of_productionもsessionに追加される
-        movie_model.actors = actors
-        movie_model.directors = directors
-        movie_model.genres = genres
-        movie_model.country_of_production = country_of_production
-        movie_model.poster = poster
-        
+        self._insert_ignoring_conflicts(ActorModel, [{"id": actor.id, "name": actor.name} for actor in movie.actors])
+        self._insert_ignoring_conflicts(DirectorModel, [{"id": director.id, "name": director.name} for director in movie.directors])
+        self._insert_ignoring_conflicts(GenreModel, [{"id": genre.id, "name": genre.name} for genre in movie.genres])
+        self._insert_ignoring_conflicts(
+            CountryOfProductionModel,
+            [{"id": movie.country_of_production.id, "name": movie.country_of_production.name}]
+        )
+
+        # 関連をIN句で一括再取得してmovie_modelに紐付けることで、中間テーブルの行も登録される
+        # NOTE: load_only+raiseloadを付けないと、モデル既定のlazy="selectin"が連鎖して
+        #       取得した俳優などの全出演作とその関連までロードしてしまう
+        actor_models = list(self.session.scalars(
+            select(ActorModel)
+            .where(ActorModel.id.in_([actor.id for actor in movie.actors]))
+            .options(load_only(ActorModel.id, ActorModel.name), raiseload("*"))
+        ))
+        director_models = list(self.session.scalars(
+            select(DirectorModel)
+            .where(DirectorModel.id.in_([director.id for director in movie.directors]))
+            .options(load_only(DirectorModel.id, DirectorModel.name), raiseload("*"))
+        ))
+        genre_models = list(self.session.scalars(
+            select(GenreModel)
+            .where(GenreModel.id.in_([genre.id for genre in movie.genres]))
+            .options(load_only(GenreModel.id, GenreModel.name), raiseload("*"))
+        ))
+        country_model = self.session.scalars(
+            select(CountryOfProductionModel)
+            .where(CountryOfProductionModel.id == movie.country_of_production.id)
+            .options(load_only(CountryOfProductionModel.id, CountryOfProductionModel.name), raiseload("*"))
+        ).one()
+
+        # NOTE: movie_modelがpendingのうちに関連を設定する
+        #       (上のSELECTのautoflushでpersistentになった後に設定すると、
+        #        既存コレクションの置き換えとして余計なロードが走る)
         self.session.add(movie_model)
+        movie_model.actors = actor_models
+        movie_model.directors = director_models
+        movie_model.genres = genre_models
+        movie_model.country_of_production = country_model
+
+    def _insert_ignoring_conflicts(self, model: type, rows: list[dict]):
+        """Insert rows at once, ignoring rows that already exist
+
+        Args:
+            model (type): ORM model class
+            rows (list[dict]): rows to insert
+        """
+        if not rows:
+            return
+        # ON CONFLICT DO NOTHINGは方言ごとのinsertビルダーでしか組み立てられない
+        dialect = self.session.get_bind().dialect.name
+        insert_fn = _INSERT_IGNORE_BUILDERS.get(dialect)
+        if insert_fn is None:
+            raise NotImplementedError(f"INSERT ... ON CONFLICT DO NOTHING is not supported for dialect: {dialect}")
+        self.session.execute(insert_fn(model).values(rows).on_conflict_do_nothing())
     
     def find_all(self) -> list[Movie]:
         """Find all movies in the database
@@ -506,14 +649,118 @@ class MovieRepository:
         Returns:
             list[Movie]: a list of movies
         """
-        stmt = select(MovieModel)
-        movie_models = self.session.scalars(stmt).unique().all()
-        
+        # コレクションをJOINで読み込むと行数が直積で膨らむため、selectinloadで取得する
+        # https://docs.sqlalchemy.org/en/20/orm/queryguide/relationships.html#select-in-loading
+        stmt = select(MovieModel).options(*_MOVIE_LOAD_OPTIONS)
+        # selectinloadと併用できるyield_perで、バッチ単位にストリーミングしながら変換する
+        # https://docs.sqlalchemy.org/en/20/orm/queryguide/api.html#fetching-large-result-sets-with-yield-per
+        movie_models = self.session.scalars(stmt.execution_options(yield_per=500))
+
+        # フェッチ(I/O)と変換(CPU)をダブルバッファで重ね合わせる:
+        # メインスレッドが次バッチを取得する間に、ワーカーが前バッチのMovieを構築する
+        # 変換はselectinloadでロード済みの属性アクセスのみのため、sessionには触れない
+        movies: list[Movie] = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for batch in itertools.batched(movie_models, 500):
+                if pending is not None:
+                    movies.extend(pending.result())
+                pending = executor.submit(
+                    lambda models=batch: [
+                        self._model_to_entity_movie(movie_model=movie_model)
+                        for movie_model in models
+                    ]
+                )
+            if pending is not None:
+                movies.extend(pending.result())
+
+        return movies
+    
+    def find_all_movies_flat(self) -> list[Movie]:
+        """Find all movies with Core selects, bypassing ORM instance overhead
+
+        読み取り専用のレスポンス用途では識別マップやInstrumentedAttributeの
+        オーバーヘッドが不要なため、必要なカラムのみをタプルで取得し、
+        中間テーブルごとのフラットな結果をアプリ側で相関させる
+
+        Returns:
+            list[Movie]: a list of movies
+        """
+        movie_rows = self.session.execute(
+            select(
+                MovieModel.id,
+                MovieModel.title,
+                MovieModel.description,
+                MovieModel.published_date,
+                MovieModel.poster_id,
+                CountryOfProductionModel.id.label("country_id"),
+                CountryOfProductionModel.name.label("country_name"),
+            ).join(CountryOfProductionModel, MovieModel.country_of_production_id == CountryOfProductionModel.id)
+        ).all()
+
+        actor_rows = self.session.execute(
+            select(movie_to_actor.c.movie_id, ActorModel.id, ActorModel.name)
+            .join(ActorModel, movie_to_actor.c.actor_id == ActorModel.id)
+        ).all()
+        director_rows = self.session.execute(
+            select(movie_to_director.c.movie_id, DirectorModel.id, DirectorModel.name)
+            .join(DirectorModel, movie_to_director.c.director_id == DirectorModel.id)
+        ).all()
+        genre_rows = self.session.execute(
+            select(movie_to_genre.c.movie_id, GenreModel.id, GenreModel.name)
+            .join(GenreModel, movie_to_genre.c.genre_id == GenreModel.id)
+        ).all()
+
+        actors_by_movie: dict[str, list[Actor]] = defaultdict(list)
+        for movie_id, actor_id, actor_name in actor_rows:
+            actors_by_movie[movie_id].append(Actor(id=actor_id, name=actor_name))
+
+        directors_by_movie: dict[str, list[Director]] = defaultdict(list)
+        for movie_id, director_id, director_name in director_rows:
+            directors_by_movie[movie_id].append(Director(id=director_id, name=director_name))
+
+        genres_by_movie: dict[str, list[Genre]] = defaultdict(list)
+        for movie_id, genre_id, genre_name in genre_rows:
+            genres_by_movie[movie_id].append(Genre(id=genre_id, name=genre_name))
+
         return [
-                    self._model_to_entity_movie(movie_model=movie_model)
-                    for movie_model in movie_models
+                    Movie(
+                        id=row.id,
+                        title=row.title,
+                        description=row.description,
+                        published_date=row.published_date,
+                        country_of_production=CountryOfProduction(
+                            id=row.country_id,
+                            name=row.country_name
+                        ),
+                        genres=genres_by_movie.get(row.id, []),
+                        directors=directors_by_movie.get(row.id, []),
+                        actors=actors_by_movie.get(row.id, []),
+                        poster=Poster(
+                            id=row.poster_id,
+                            binary=None,
+                            filename=None
+                        )
+                    )
+                    for row in movie_rows
                 ]
-    
+
+    def find_poster_id(self, movie_id: str) -> str | None:
+        """Find the poster id of a movie in the database
+
+        ポスター配信では関連エンティティが不要なため、
+        MovieModel全体をロードせずposter_idのみを取得する
+
+        Args:
+            movie_id (str): id of the movie
+
+        Returns:
+            str | None: a poster id or None
+                "None" is returned if the movie is not found
+        """
+        stmt = select(MovieModel.poster_id).where(MovieModel.id == movie_id)
+        return self.session.scalars(stmt).first()
+
     def find_by_title_and_year(self, title: str, published_date: datetime.date) -> Movie | None:
         """Find a movie by title and published date in the database
 
@@ -524,8 +771,10 @@ class MovieRepository:
         Returns:
             Movie | None: _description_
         """
-        stmt = select(MovieModel).where(MovieModel.title == title, MovieModel.published_date == published_date)
-        movie_model = self.session.scalars(stmt).first()
+        movie_model = self.session.scalars(
+                    _STMT_MOVIE_BY_TITLE_AND_YEAR,
+                    {"title": title, "published_date": published_date}
+                ).first()
         
         if movie_model is None:
             return None
@@ -550,18 +799,6 @@ class MovieRepository:
                     poster_id=movie_entity.poster.id
                 )
     
-    def _model_to_entity_actor(self, actor_model: ActorModel) -> Actor:
-        return Actor(id=actor_model.id, name=actor_model.name)
-    
-    def _model_to_entity_director(self, director_model: DirectorModel) -> Director:
-        return Director(id=director_model.id, name=director_model.name)
-    
-    def _model_to_entity_genre(self, genre_model: GenreModel) -> Genre:
-        return Genre(id=genre_model.id, name=genre_model.name)
-    
-    def _model_to_entity_country(self, country_model: CountryOfProductionModel) -> CountryOfProduction:
-        return CountryOfProduction(id=country_model.id, name=country_model.name)
-    
     def _model_to_entity_movie(self, movie_model: MovieModel) -> Movie:
         """ORM model to Domain model
 
@@ -571,56 +808,8 @@ class MovieRepository:
         Returns:
             Movie: Domain model
         """
-        return Movie(
-                    id=movie_model.id,
-                    title=movie_model.title,
-                    description=movie_model.description,
-                    published_date=movie_model.published_date,
-                    country_of_production=CountryOfProduction(
-                        id=movie_model.country_of_production.id,
-                        name=movie_model.country_of_production.name
-                    ),
-                    genres=[
-                        Genre(
-                            id=genre.id,
-                            name=genre.name
-                        )
-                        for genre in movie_model.genres
-                    ],
-                    directors=[
-                        Director(
-                            id=director.id,
-                            name=director.name
-                        )
-                        for director in movie_model.directors
-                    ],
-                    actors=[
-                        Actor(
-                            id=actor.id,
-                            name=actor.name
-                        )
-                        for actor in movie_model.actors
-                    ],
-                    poster=Poster(
-                        id=movie_model.poster.id,
-                        binary=None,
-                        filename=None
-                    )
-                )
-    
-    def _entity_to_model_actor(self, actor_entity: Actor) -> ActorModel:
-        return ActorModel(id=actor_entity.id, name=actor_entity.name)
-    
-    def _entity_to_model_director(self, director_entity: Director) -> DirectorModel:
-        return DirectorModel(id=director_entity.id, name=director_entity.name)
+        return _movie_model_to_entity(movie_model=movie_model)
     
-    def _entity_to_model_genre(self, genre_entity: Genre) -> GenreModel:
-        return GenreModel(id=genre_entity.id, name=genre_entity.name)
-    
-    def _entity_to_model_country(self, country_entity: CountryOfProduction) -> CountryOfProductionModel:
-        return CountryOfProductionModel(id=country_entity.id, name=country_entity.name)
-
-
 class PosterRepository:
     def __init__(self, session: PosterFileStorageSession):
         self.session = session
@@ -633,40 +822,87 @@ class PosterRepository:
         """
         self.session.add(poster)
     
-    def find_by_id(self, id: uuid.UUID) -> Poster | None:
+    def find_by_id(self, id: str) -> Poster | None:
         """Find a poster by id in the directory
 
         Args:
-            id (uuid.UUID): id of the poster
+            id (str): id of the poster
 
         Returns:
             Poster | None: a poster or None
+                "None" is returned if the poster is not found
         """
-        
-    
+        filepath = self.find_path_by_id(id=id)
 
-    #     file_path = self.directory / poster.filename
-    #     with open(file_path, "wb") as f:
-    #         f.write(poster.binary)        
-    
-    # def find_by_id(self, id: uuid.UUID) -> Poster | None:
-    #     """Find a poster by id in the directory
-        
-    #     Args:
-    #         id (uuid.UUID): id of the poster
-        
-    #     Returns:
-    #         Poster | None: a poster or None
-    #     """
-    #     filepath = self.directory / pathlib.Path(f"{id}.jpg")
-        
-    #     if filepath.parent != self.directory:
-    #         raise ValueError("Access outside the base directory is not allowed.") # TODO: 例外クラスを作成
-        
-    #     if not filepath.exists():
-    #         raise FileNotFoundError(f"{filepath} not found.") 
-        
-    #     with open(filepath, "rb") as f:
-    #         binary = f.read()
-        
-    #     return Poster(id=id, binary=binary, filename=filepath.name)
\ No newline at end of file
+        if filepath is None:
+            return None
+
+        # ファイル全体をbytesへコピーせず、ページキャッシュをそのまま参照する
+        # ゼロコピー読み込みにする(mmapはfdを複製するためopenはすぐ閉じてよい)
+        # memoryviewがmmapを参照し続けるため、Posterの生存中はマッピングも有効
+        with open(filepath, "rb") as f:
+            if filepath.stat().st_size == 0:
+                return Poster(id=id, binary=b"", filename=filepath.name)
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return Poster(id=id, binary=memoryview(mm), filename=filepath.name)
+
+    def find_path_by_id(self, id: str) -> pathlib.Path | None:
+        """Find the file path of a poster by id in the directory
+
+        バイナリをPython側へ読み込まず、FileResponse(sendfile)でそのまま
+        送信できるようにパスを返す
+
+        Args:
+            id (str): id of the poster
+
+        Returns:
+            pathlib.Path | None: a file path or None
+                "None" is returned if the poster is not found
+        """
+        return _resolve_poster_path(base_dir=self.session.base_dir, id=str(id))
+
+# ホットなポスターのパス計算(sha256ハッシュ)のみをキャッシュする
+# IDからパスへの対応は不変なのでクリア不要。存在チェックはここに含めず
+# 毎回行う(_resolve_poster_pathを参照)
+@functools.lru_cache(maxsize=64)
+def _poster_filepath(base_dir: pathlib.Path, id: str) -> pathlib.Path:
+    """Compute the file path of a poster from its id
+
+    Args:
+        base_dir (pathlib.Path): base directory of the poster files
+        id (str): id of the poster
+
+    Returns:
+        pathlib.Path: the file path the poster would be stored at
+    """
+    # ファイル名はポスターIDから再計算できる(factories.create_posterを参照)
+    filename = hashlib.sha256(id.encode()).hexdigest()
+    filepath = base_dir / filename
+
+    if filepath.parent != base_dir:
+        raise ValueError("Access outside the base directory is not allowed.") # TODO: 例外クラスを作成
+
+    return filepath
+
+
+def _resolve_poster_path(base_dir: pathlib.Path, id: str) -> pathlib.Path | None:
+    """Resolve the file path of a poster from its id
+
+    Args:
+        base_dir (pathlib.Path): base directory of the poster files
+        id (str): id of the poster
+
+    Returns:
+        pathlib.Path | None: a file path or None
+            "None" is returned if the poster is not found
+    """
+    # パス計算(sha256)のみキャッシュし、存在チェックは毎回行う
+    # (不在までキャッシュすると、別プロセスや手動で置かれたファイルが
+    #  エントリが追い出されるまで404のままになる)
+    filepath = _poster_filepath(base_dir, id)
+
+    if not filepath.exists():
+        return None
+
+    return filepath
@@ -1,4 +1,6 @@
+import os
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 from sqlalchemy import create_engine
@@ -20,24 +22,40 @@ class PosterFileStorageSession:
         Args:
             poster (Poster): _description_
         """
+        # パス検証はcommitのホットループではなく追加時に一度だけ行う
+        save_path = self.base_dir / poster.filename
+        if save_path.parent != self.base_dir:
+            raise ValueError("Access outside the base directory is not allowed.") # TODO: 例外クラスを作成
+
         self.posters.append(poster)
-    
+
     def commit(self):
         """_summary_
         """
-        
-        for poster in self.posters:
-            save_path = self.base_dir / poster.filename
-            if save_path.exists():
-                raise FileExistsError(f"{str(save_path)} already exists.")
-            
-            if save_path.parent != self.base_dir:
-                raise ValueError("Access outside the base directory is not allowed.") # TODO: 例外クラスを作成
-            
-            with open(save_path, "wb") as f:
-                f.write(poster.binary)
-        
+        if not self.posters:
+            return
+
+        # 直列のopen/write/closeループはポスター数に比例して待ち時間が伸びるため、
+        # スレッドプールでN件の書き込みを並行させる
+        with ThreadPoolExecutor(max_workers=min(8, len(self.posters))) as executor:
+            list(executor.map(self._write_one, self.posters))
+
+
         self.posters = []
+
+    def _write_one(self, poster: Poster):
+        """1件のポスターをファイルへ書き込む
+
+        Args:
+            poster (Poster): Domain model
+        """
+        save_path = self.base_dir / poster.filename
+        # O_EXCLにより存在チェックと作成をアトミックに行う(既存ならFileExistsError)
+        fd = os.open(str(save_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        try:
+            os.write(fd, poster.binary)
+        finally:
+            os.close(fd)
     
     def rollback(self):
         """_summary_
@@ -69,25 +87,33 @@ class UnitOfWork:
         return self
     
     def __exit__(self, exc_type, exc_value, traceback):
-        if exc_type is not None:
-            self.rollback()
+        # 正常終了時のcommitは呼び出し側が明示的に行う
+        # 例外時のみロールバックし、closeはどちらの経路でも一度だけ実行する
+        try:
+            if exc_type is not None:
+                self.rollback()
+        finally:
             self.close()
-        self.close()
-    
+
     def commit(self):
         """
         """
         self.session.commit()
         self.poster_file_storage_session.commit()
-    
+
     def rollback(self):
         """
         """
-        self.session.rollback()
-        self.poster_file_storage_session.rollback()
-    
+        # __enter__が途中で失敗した場合はセッションが未生成のことがある
+        if self.session is not None:
+            self.session.rollback()
+        if self.poster_file_storage_session is not None:
+            self.poster_file_storage_session.rollback()
+
     def close(self):
         """
         """
-        self.session.close()
-        self.poster_file_storage_session.close()
\ No newline at end of file
+        if self.session is not None:
+            self.session.close()
+        if self.poster_file_storage_session is not None:
+            self.poster_file_storage_session.close()
\ No newline at end of file
@@ -1,11 +1,12 @@
-from pathlib import Path
+import asyncio
+from uuid import uuid4
 
 import pytest
-from alembic import command
-from alembic.config import Config
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from fastapi_cache import FastAPICache
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.api.main import app
 from app.api.routers.movies import get_db
@@ -16,11 +17,8 @@ from app.api.schemas.movies import (
     CountryOfProductionBase,
     MovieCreate,
 )
-from app.core.factories import (
-    create_genre,
-    create_country_of_production,
-)
 from app.core.usecase.movies import MovieUseCase
+from app.persistence.models import Base, CountryOfProductionModel, GenreModel
 from app.persistence.repositories import (
     ActorRepository,
     DirectorRepository,
@@ -30,54 +28,84 @@ from app.persistence.repositories import (
 )
 
 
-@pytest.fixture(scope="function")
-def session():
-    """Create a new session for each test."""
-    # テスト用のSQLiteデータベースを設定
-    engine = create_engine("sqlite:///./test.db")
-    session = scoped_session(
-        sessionmaker(
-            bind=engine,
-            autocommit=False,
-            autoflush=False
-        )
+@pytest.fixture(scope="session")
+def engine():
+    """Create the test engine and schema once per test session."""
+    # ファイルI/O・fsync・テスト後のos.removeを避けるため、インメモリSQLiteを使用する
+    # StaticPoolで単一コネクションを共有し、全セッションから同じDBが見えるようにする
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
     )
 
-    # Alembicの設定ファイルを読み込む
-    alembic_cfg_file = Path(__file__).parent.parent / "alembic.ini"
-    alembic_cfg = Config(str(alembic_cfg_file))
-    
-    alembic_cfg.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
-    alembic_cfg.set_main_option("sqlalchemy.url", "sqlite:///./test.db")
+    # pysqliteは暗黙のトランザクション制御がSAVEPOINTと両立しないため、
+    # ドライバ側の制御を無効化してSQLAlchemyがBEGINを発行するようにする
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    @event.listens_for(engine, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    # マイグレーションを適用する代わりに、モデル定義から直接スキーマを作成する
+    Base.metadata.create_all(engine)
+
+    try:
+        yield engine
+    finally:
+        engine.dispose()
 
-    # Alembicを使用してマイグレーションを適用
-    command.upgrade(alembic_cfg, "head")
+@pytest.fixture(scope="function")
+def session(engine):
+    """Create a new session for each test."""
+    # スキーマ作成をテストごとに繰り返さず、外側トランザクションのロールバックで
+    # テスト間を分離する(テスト内のcommitはSAVEPOINTとして扱われる)
+    connection = engine.connect()
+    transaction = connection.begin()
+    # テストはシングルスレッドのため、scoped_sessionのスレッドローカル管理は不要
+    session = sessionmaker(
+        bind=connection,
+        autocommit=False,
+        autoflush=False,
+        join_transaction_mode="create_savepoint"
+    )()
 
     try:
         yield session
     finally:
-        # テスト終了後にセッションを閉じ、データベースファイルを削除
         session.close()
-        engine.dispose()
-        import os
-        os.remove("test.db")
+        transaction.rollback()
+        connection.close()
+
+
+def seed(session, model, names):
+    """名前のリストを1回のマルチローINSERTで登録するテスト用ヘルパー"""
+    session.execute(insert(model), [{"id": uuid4().hex, "name": name} for name in names])
 
 @pytest.fixture(scope="function")
 def client(session):
     """テストクライアントを提供するフィクスチャ。"""
     def get_db_override():
         """テスト用のDB依存関数を返す。"""
-        try:
-            yield session
-        finally:
-            session.remove()
+        # セッションの後始末はsessionフィクスチャのteardownで行う
+        yield session
 
     # 依存関係を上書き
     app.dependency_overrides[get_db] = get_db_override
 
     # テストクライアントを返す
-    with TestClient(app) as client:
-        yield client
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        # レスポンスキャッシュを破棄し、次のテストのlifespanで再初期化させる
+        # (InMemoryBackendはストアをクラス変数で共有するため、reset()だけでは
+        #  前のテストのレスポンスが残り続ける)
+        asyncio.run(FastAPICache.clear())
+        FastAPICache.reset()
 
 def test_health(client):
     """ヘルスチェックのテスト
@@ -92,16 +120,9 @@ def test_get_all_movies(session, client):
     # -------------------
     # Arrange
     # -------------------
-    genre_repo = GenreRepository(session)
-    country_repo = CountryOfProductionRepository(session)
-    
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Sci-Fi"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    
-    country_repo.add(create_country_of_production(name="USA"))
-    country_repo.add(create_country_of_production(name="UK"))
+    # 1件ずつrepo.addするのではなく、テーブルごとに1回のexecutemanyで投入する
+    seed(session, GenreModel, ["Action", "Adventure", "Sci-Fi", "Fantasy"])
+    seed(session, CountryOfProductionModel, ["USA", "UK"])
     session.commit()
     
     movie_create = MovieCreate(
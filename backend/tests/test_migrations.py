@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+# alembic.iniの読み込み・パースはモジュールロード時の1回で済ませる
+_ALEMBIC_CFG = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+_ALEMBIC_CFG.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
+
+
+def test_migrations_upgrade_to_head():
+    """Alembicマイグレーションのテスト
+
+    各フィクスチャはcreate_allでスキーマを作成するため、
+    マイグレーション自体が最後まで適用できることはここで検証する
+    """
+    # -------------------
+    # Arrange
+    # -------------------
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    # -------------------
+    # Act
+    # -------------------
+    # 確立済みコネクションを渡してマイグレーションを適用する(env.pyが再利用する)
+    with engine.connect() as connection:
+        _ALEMBIC_CFG.attributes["connection"] = connection
+        command.upgrade(_ALEMBIC_CFG, "head")
+        connection.commit()
+
+    # -------------------
+    # Assert
+    # -------------------
+    tables = set(inspect(engine).get_table_names())
+    assert {"movies", "actors", "directors", "genres", "countries_of_production"}.issubset(tables)
+
+    engine.dispose()
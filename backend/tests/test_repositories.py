@@ -2,11 +2,11 @@ import datetime
 from pathlib import Path
 
 import pytest
-from alembic import command
-from alembic.config import Config
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from app.persistence.models import Base
 from app.persistence.repositories import (
     ActorRepository,
     DirectorRepository,
@@ -25,124 +25,99 @@ from app.core.factories import (
     create_poster
 )
 
-@pytest.fixture(scope="function")
-def session():
-    """Create a new session for each test."""
-    # テスト用のSQLiteデータベースを設定
-    engine = create_engine("sqlite:///./test.db")
-    session = scoped_session(
-        sessionmaker(
-            bind=engine,
-            autocommit=False,
-            autoflush=False
-        )
+@pytest.fixture(scope="session")
+def engine():
+    """Create the test engine and run migrations once per test session."""
+    # ディスクI/O・fsync・テスト後のos.removeを避けるため、インメモリSQLiteを使用する
+    # StaticPoolで単一コネクションを共有し、Alembicとテストから同じDBが見えるようにする
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
     )
 
-    # Alembicの設定ファイルを読み込む
-    alembic_cfg_file = Path(__file__).parent.parent / "alembic.ini"
-    alembic_cfg = Config(str(alembic_cfg_file))
-    
-    alembic_cfg.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
-    alembic_cfg.set_main_option("sqlalchemy.url", "sqlite:///./test.db")
+    # pysqliteは暗黙のトランザクション制御がSAVEPOINTと両立しないため、
+    # ドライバ側の制御を無効化してSQLAlchemyがBEGINを発行するようにする
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    @event.listens_for(engine, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
 
-    # Alembicを使用してマイグレーションを適用
-    command.upgrade(alembic_cfg, "head")
+    @event.listens_for(engine, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    # マイグレーションを適用する代わりに、モデル定義から直接スキーマを作成する
+    # (Alembic自体はtest_migrations.pyで検証する)
+    Base.metadata.create_all(engine)
+
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+@pytest.fixture(scope="function")
+def session(engine):
+    """Create a new session for each test."""
+    # マイグレーションをテストごとに繰り返さず、外側トランザクションのロールバックで
+    # テスト間を分離する(テスト内のcommitはSAVEPOINTとして扱われる)
+    connection = engine.connect()
+    transaction = connection.begin()
+    # テストはシングルスレッドのため、scoped_sessionのスレッドローカル管理は不要
+    session = sessionmaker(
+        bind=connection,
+        autocommit=False,
+        autoflush=False,
+        join_transaction_mode="create_savepoint"
+    )()
 
     try:
         yield session
     finally:
-        # テスト終了後にセッションを閉じ、データベースファイルを削除
         session.close()
-        engine.dispose()
-        import os
-        os.remove("test.db")
+        transaction.rollback()
+        connection.close()
 
 
-def test_actor_repository_when_add_actor(session):
-    """Test ActorRepository
-    """
-    # -------------------
-    # Arrange
-    # -------------------
-    actor_name = "Robert Downey Jr."
-    actor_repository = ActorRepository(session=session)
-    robert = create_actor(name=actor_name)
-    
-    # -------------------
-    # Act
-    # -------------------
-    actor_repository.add(robert)
-    session.flush()
-    
-    # -------------------
-    # Assert
-    # -------------------
-    assert actor_repository.find_by_name(name=actor_name) == robert
+@pytest.fixture(scope="session")
+def inception_poster_bytes():
+    """ポスター画像(約220KB)をセッション中1回だけ読み込んで共有する"""
+    # 実ファイル名は大文字始まり(Inception.jpg)である点に注意
+    return Path(__file__).parent.joinpath("assets/Inception.jpg").read_bytes()
 
-def test_director_repository_when_add_director(session):
-    """Test DirectorRepository
-    """
-    # -------------------
-    # Arrange
-    # -------------------
-    director_name = "Christopher Nolan"
-    director_repository = DirectorRepository(session=session)
-    christopher = create_director(name=director_name)
-    
-    # -------------------
-    # Act
-    # -------------------
-    director_repository.add(christopher)
-    session.flush()
-    
-    # -------------------
-    # Assert
-    # -------------------
-    assert director_repository.find_by_name(name=director_name) == christopher
 
-def test_country_of_production_repository_when_add_country_of_production(session):
-    """Test CountryOfProductionRepository
-    """
-    # -------------------
-    # Arrange
-    # -------------------
-    country_name = "USA"
-    country_repository = CountryOfProductionRepository(session=session)
-    usa = create_country_of_production(name=country_name)
-    
-    # -------------------
-    # Act
-    # -------------------
-    country_repository.add(usa)
-    session.flush()
-    
-    # -------------------
-    # Assert
-    # -------------------
-    assert country_repository.find_by_name(name=country_name) == usa
+@pytest.mark.parametrize(
+    "repo_cls, factory, name",
+    [
+        (ActorRepository, create_actor, "Robert Downey Jr."),
+        (DirectorRepository, create_director, "Christopher Nolan"),
+        (CountryOfProductionRepository, create_country_of_production, "USA"),
+        (GenreRepository, create_genre, "Action"),
+    ],
+)
+def test_simple_repository_when_add(session, repo_cls, factory, name):
+    """Test name-only repositories (actor/director/country/genre)
 
-def test_genre_repository_when_add_genre(session):
-    """Test GenreRepository
+    構造が同一だった4つのadd/findテストを1つにパラメタライズしている
     """
     # -------------------
     # Arrange
     # -------------------
-    genre_name = "Action"
-    genre_repository = GenreRepository(session=session)
-    action = create_genre(name=genre_name)
-    
+    repository = repo_cls(session=session)
+    entity = factory(name=name)
+
     # -------------------
     # Act
     # -------------------
-    genre_repository.add(action)
+    repository.add(entity)
     session.flush()
-    
+
     # -------------------
     # Assert
     # -------------------
-    assert genre_repository.find_by_name(name=genre_name) == action
+    assert repository.find_by_name(name=name) == entity
 
-def test_movie_repository_when_add_movie(session):
+def test_movie_repository_when_add_movie(session, inception_poster_bytes):
     """Test MovieRepository
     """
     # -------------------
@@ -160,9 +135,7 @@ def test_movie_repository_when_add_movie(session):
     usa = create_country_of_production(name="USA")
     sci_fi = create_genre(name="Sci-Fi")
     
-    with open("tests/assets/inception.jpg", "rb") as f:
-        byte = f.read()
-    poster = create_poster(byte=byte)
+    poster = create_poster(byte=inception_poster_bytes)
     
     # Add entities
     actor_repository.add(leo)
@@ -192,4 +165,119 @@ def test_movie_repository_when_add_movie(session):
     # -------------------
     # Assert
     # -------------------
-    assert movie_repository.find_all()[0] == movie
\ No newline at end of file
+    assert movie_repository.find_all()[0] == movie
+
+def test_movie_repository_find_all_does_not_lazy_load(session):
+    """Test MovieRepository
+    
+    find_allがraiseload設定のもとで遅延ロードなしに全関連を取得できることを確認するテスト
+    """
+    # -------------------
+    # Arrange
+    # -------------------
+    import uuid
+    
+    from app.api.schemas.movies import MovieResponse
+    from app.persistence.models import (
+        ActorModel,
+        CountryOfProductionModel,
+        DirectorModel,
+        GenreModel,
+        MovieModel,
+    )
+    
+    movie_model = MovieModel(
+        id=str(uuid.uuid4()),
+        title="Inception",
+        description="A thief who steals corporate secrets through the use of dream-sharing technology.",
+        published_date=datetime.date(2010, 7, 16),
+        poster_id=str(uuid.uuid4()),
+    )
+    movie_model.actors = [ActorModel(id=str(uuid.uuid4()), name="Leonardo DiCaprio")]
+    movie_model.directors = [DirectorModel(id=str(uuid.uuid4()), name="Christopher Nolan")]
+    movie_model.genres = [GenreModel(id=str(uuid.uuid4()), name="Sci-Fi")]
+    movie_model.country_of_production = CountryOfProductionModel(id=str(uuid.uuid4()), name="USA")
+    
+    session.add(movie_model)
+    session.commit()
+    # 識別マップをクリアし、関連がクエリから読み込まれることを保証する
+    session.expunge_all()
+    
+    movie_repository = MovieRepository(session=session)
+    
+    # -------------------
+    # Act
+    # -------------------
+    movies = movie_repository.find_all()
+    
+    # -------------------
+    # Assert
+    # -------------------
+    # raiseload("*")により、遅延ロードが発生した場合はInvalidRequestErrorが送出される
+    responses = [MovieResponse.model_validate(movie) for movie in movies]
+    
+    assert len(responses) == 1
+    assert responses[0].title == "Inception"
+    assert [actor.name for actor in responses[0].actors] == ["Leonardo DiCaprio"]
+
+def test_movie_repository_find_all_query_count(session):
+    """Test MovieRepository
+
+    find_allの発行クエリ数が一定(映画1 + 関連コレクション3 + α)に収まることを確認するテスト
+    N+1が再発した場合は映画数に比例してクエリ数が増え、このテストが失敗する
+    """
+    # -------------------
+    # Arrange
+    # -------------------
+    import uuid
+
+    from sqlalchemy import event
+    from app.persistence.models import (
+        ActorModel,
+        CountryOfProductionModel,
+        DirectorModel,
+        GenreModel,
+        MovieModel,
+    )
+
+    country = CountryOfProductionModel(id=str(uuid.uuid4()), name="USA")
+    for i in range(3):
+        movie_model = MovieModel(
+            id=str(uuid.uuid4()),
+            title=f"Movie {i}",
+            description=f"Description {i}",
+            published_date=datetime.date(2010 + i, 1, 1),
+            poster_id=str(uuid.uuid4()),
+        )
+        movie_model.actors = [ActorModel(id=str(uuid.uuid4()), name=f"Actor {i}")]
+        movie_model.directors = [DirectorModel(id=str(uuid.uuid4()), name=f"Director {i}")]
+        movie_model.genres = [GenreModel(id=str(uuid.uuid4()), name=f"Genre {i}")]
+        movie_model.country_of_production = country
+        session.add(movie_model)
+    session.commit()
+    session.expunge_all()
+
+    movie_repository = MovieRepository(session=session)
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_statements)
+
+    # -------------------
+    # Act
+    # -------------------
+    try:
+        movies = movie_repository.find_all()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statements)
+
+    # -------------------
+    # Assert
+    # -------------------
+    assert len(movies) == 3
+    # 映画本体(+joinedloadの製作国)で1クエリ、selectinloadのコレクション3つで3クエリ
+    assert len(statements) <= 5
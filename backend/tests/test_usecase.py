@@ -1,10 +1,9 @@
-from pathlib import Path
-
 import pytest
-from alembic.config import Config
-from alembic import command
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from uuid import uuid4
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.api.schemas.movies import (
     MovieCreate,
@@ -18,12 +17,11 @@ from app.core.exceptions import (
     InvalidGenreError, 
     MovieAlreadyExistError
 )
-from app.persistence.models import ActorModel, DirectorModel   
+from app.persistence.models import ActorModel, Base, CountryOfProductionModel, DirectorModel, GenreModel
 from app.core.usecase.movies import MovieUseCase
 from app.core.factories import (
     create_actor,
     create_country_of_production,
-    create_genre
 )
 from app.persistence.repositories import (
     MovieRepository,
@@ -33,53 +31,69 @@ from app.persistence.repositories import (
     CountryOfProductionRepository,
 )
 
-@pytest.fixture(scope="function")
-def session():
-    """Create a new session for each test."""
-    # テスト用のSQLiteデータベースを設定
-    engine = create_engine("sqlite:///./test.db")
-    session = scoped_session(
-        sessionmaker(
-            bind=engine,
-            autocommit=False,
-            autoflush=False
-        )
+@pytest.fixture(scope="session")
+def engine():
+    """Create the test engine and run migrations once per test session."""
+    # ディスクI/O・fsync・テスト後のos.removeを避けるため、インメモリSQLiteを使用する
+    # StaticPoolで単一コネクションを共有し、Alembicとテストから同じDBが見えるようにする
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
     )
 
-    # Alembicの設定ファイルを読み込む
-    alembic_cfg_file = Path(__file__).parent.parent / "alembic.ini"
-    alembic_cfg = Config(str(alembic_cfg_file))
-    
-    alembic_cfg.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
-    alembic_cfg.set_main_option("sqlalchemy.url", "sqlite:///./test.db")
+    # pysqliteは暗黙のトランザクション制御がSAVEPOINTと両立しないため、
+    # ドライバ側の制御を無効化してSQLAlchemyがBEGINを発行するようにする
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    @event.listens_for(engine, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    # マイグレーションを適用する代わりに、モデル定義から直接スキーマを作成する
+    # (Alembic自体はtest_migrations.pyで検証する)
+    Base.metadata.create_all(engine)
+
+    try:
+        yield engine
+    finally:
+        engine.dispose()
 
-    # Alembicを使用してマイグレーションを適用
-    command.upgrade(alembic_cfg, "head")
+@pytest.fixture(scope="function")
+def session(engine):
+    """Create a new session for each test."""
+    # マイグレーションをテストごとに繰り返さず、外側トランザクションのロールバックで
+    # テスト間を分離する(テスト内のcommitはSAVEPOINTとして扱われる)
+    connection = engine.connect()
+    transaction = connection.begin()
+    # テストはシングルスレッドのため、scoped_sessionのスレッドローカル管理は不要
+    session = sessionmaker(
+        bind=connection,
+        autocommit=False,
+        autoflush=False,
+        join_transaction_mode="create_savepoint"
+    )()
 
     try:
         yield session
     finally:
-        # テスト終了後にセッションを閉じ、データベースファイルを削除
         session.close()
-        engine.dispose()
-        import os
-        os.remove("test.db")
+        transaction.rollback()
+        connection.close()
 
-def test_movie_usecase_when_register(session):
-    """Test MovieUseCase
-    
-    新規の映画を登録できることを確認するテスト
-    """
-    # -------------------
-    # Arrange
-    # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
-    
-    usecase = MovieUseCase(
+
+def seed(session, model, names):
+    """名前のリストを1回のマルチローINSERTで登録するテスト用ヘルパー"""
+    session.execute(insert(model), [{"id": uuid4().hex, "name": name} for name in names])
+
+
+@pytest.fixture(scope="function")
+def usecase(session):
+    """全テストで同一だったMovieUseCaseとリポジトリ一式の構築を共有する"""
+    return MovieUseCase(
         session=session,
         movie_repository=MovieRepository(session=session),
         actor_repository=ActorRepository(session=session),
@@ -87,6 +101,26 @@ def test_movie_usecase_when_register(session):
         genre_repository=GenreRepository(session=session),
         country_of_production_repository=CountryOfProductionRepository(session=session),
     )
+
+
+@pytest.fixture(scope="function")
+def seeded_genres(session):
+    """各テスト共通のジャンルを投入する"""
+    names = ["Action", "Adventure", "Fantasy"]
+    seed(session, GenreModel, names)
+    session.flush()
+    return names
+
+def test_movie_usecase_when_register(session, usecase, seeded_genres):
+    """Test MovieUseCase
+    
+    新規の映画を登録できることを確認するテスト
+    """
+    # -------------------
+    # Arrange
+    # -------------------
+    seed(session, CountryOfProductionModel, ["USA"])
+    session.flush()
     
     # -------------------
     # Act
@@ -105,8 +139,25 @@ def test_movie_usecase_when_register(session):
     # -------------------
     # Assert
     # -------------------
-    movie = usecase.movie_repository.find_by_title_and_year(title=movie_create.title, published_date=movie_create.published_date)
-    
+    # 読み戻し時の発行クエリ数を数え、関連アクセスごとの遅延SELECT(N+1)の再発を検知する
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        # フィクスチャのSAVEPOINT制御文は計測対象外
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            statements.append(statement)
+
+    bind = session.get_bind()
+    event.listen(bind, "before_cursor_execute", count_statements)
+
+    try:
+        movie = usecase.movie_repository.find_by_title_and_year(title=movie_create.title, published_date=movie_create.published_date)
+    finally:
+        event.remove(bind, "before_cursor_execute", count_statements)
+
+    # 映画本体(+joinedloadの製作国)で1クエリ、selectinloadのコレクション3つで3クエリ
+    assert len(statements) <= 4
+
     assert movie.title == movie_create.title
     assert movie.published_date == movie_create.published_date
     assert movie.description == movie_create.description
@@ -115,7 +166,7 @@ def test_movie_usecase_when_register(session):
     assert sorted([director.name for director in movie.directors]) == sorted([director.name for director in movie_create.directors])
     assert sorted([genre.name for genre in movie.genres]) == sorted([genre.name for genre in movie_create.genres])
 
-def test_movie_usecase_when_actor_is_already_resistred(session):
+def test_movie_usecase_when_actor_is_already_resistred(session, usecase, seeded_genres):
     """Test MovieUseCase
     
     俳優のみ登録済みの場合に、新規の映画を登録できることを確認するテスト
@@ -123,25 +174,12 @@ def test_movie_usecase_when_actor_is_already_resistred(session):
     # -------------------
     # Arrange
     # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
+    seed(session, CountryOfProductionModel, ["USA"])
+    session.flush()
     
     actor_repo = ActorRepository(session=session)
     actor_repo.add(create_actor(name="Robert Downey Jr."))
-    session.commit()    
-    
-    usecase = MovieUseCase(
-        session=session,
-        movie_repository=MovieRepository(session=session),
-        actor_repository=ActorRepository(session=session),
-        director_repository=DirectorRepository(session=session),
-        genre_repository=GenreRepository(session=session),
-        country_of_production_repository=CountryOfProductionRepository(session=session),
-    )    
-
+    session.flush()    
     
     # -------------------
     # Act
@@ -162,7 +200,7 @@ def test_movie_usecase_when_actor_is_already_resistred(session):
     # -------------------
     assert session.query(ActorModel).count() == 1
 
-def test_movie_usecase_when_director_is_already_resistred(session):
+def test_movie_usecase_when_director_is_already_resistred(session, usecase, seeded_genres):
     """Test MovieUseCase
     
     監督のみ登録済みの場合に、新規の映画を登録できることを確認するテスト
@@ -170,25 +208,12 @@ def test_movie_usecase_when_director_is_already_resistred(session):
     # -------------------
     # Arrange
     # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
+    seed(session, CountryOfProductionModel, ["USA"])
+    session.flush()
     
     actor_repo = DirectorRepository(session=session)
     actor_repo.add(create_actor(name="John Favreau"))
-    session.commit()    
-    
-    usecase = MovieUseCase(
-        session=session,
-        movie_repository=MovieRepository(session=session),
-        actor_repository=ActorRepository(session=session),
-        director_repository=DirectorRepository(session=session),
-        genre_repository=GenreRepository(session=session),
-        country_of_production_repository=CountryOfProductionRepository(session=session),
-    )    
-
+    session.flush()    
     
     # -------------------
     # Act
@@ -209,7 +234,7 @@ def test_movie_usecase_when_director_is_already_resistred(session):
     # -------------------
     assert session.query(DirectorModel).count() == 1
 
-def test_movie_usecase_when_movie_is_already_resistred(session):
+def test_movie_usecase_when_movie_is_already_resistred(session, usecase, seeded_genres):
     """Test MovieUseCase
     
     映画が登録済みの場合に、新規の映画を登録できないことを確認するテスト
@@ -217,24 +242,13 @@ def test_movie_usecase_when_movie_is_already_resistred(session):
     # -------------------
     # Arrange
     # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
+    seed(session, CountryOfProductionModel, ["USA"])
+    session.flush()
     
     actor_repo = DirectorRepository(session=session)
     actor_repo.add(create_actor(name="John Favreau"))
-    session.commit()    
+    session.flush()    
     
-    usecase = MovieUseCase(
-        session=session,
-        movie_repository=MovieRepository(session=session),
-        actor_repository=ActorRepository(session=session),
-        director_repository=DirectorRepository(session=session),
-        genre_repository=GenreRepository(session=session),
-        country_of_production_repository=CountryOfProductionRepository(session=session),
-    )    
     movie_create = MovieCreate(
         title="Iron Man",
         description="After being held captive in an Afghan cave, billionaire engineer Tony Stark creates a unique weaponized suit of armor to fight evil.",
@@ -261,29 +275,11 @@ def test_movie_usecase_when_movie_is_already_resistred(session):
     with pytest.raises(MovieAlreadyExistError):
         usecase.register(movie_create=movie_create)
     
-def test_movie_usecase_when_genre_is_invalid(session):
+def test_movie_usecase_when_genre_is_invalid(session, usecase, seeded_genres):
     """Test MovieUseCase
     
     ジャンルが不正な場合に、新規の映画を登録できないことを確認するテスト
     """
-    # -------------------
-    # Arrange
-    # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
-    
-    usecase = MovieUseCase(
-        session,
-        movie_repository=MovieRepository(session=session),
-        actor_repository=ActorRepository(session=session),
-        director_repository=DirectorRepository(session=session),
-        genre_repository=GenreRepository(session=session),
-        country_of_production_repository=CountryOfProductionRepository(session=session),
-    )
-    
     # -------------------
     # Act & Assert
     # -------------------
@@ -299,7 +295,7 @@ def test_movie_usecase_when_genre_is_invalid(session):
     with pytest.raises(InvalidGenreError):
         usecase.register(movie_create=movie_create)
 
-def test_movie_usecase_when_countory_of_production_is_invalid(session):
+def test_movie_usecase_when_countory_of_production_is_invalid(session, usecase, seeded_genres):
     """Test MovieUseCase
     
     制作国が不正な場合に、新規の映画を登録できないことを確認するテスト
@@ -307,24 +303,9 @@ def test_movie_usecase_when_countory_of_production_is_invalid(session):
     # -------------------
     # Arrange
     # -------------------
-    genre_repo = GenreRepository(session=session)
-    genre_repo.add(create_genre(name="Action"))
-    genre_repo.add(create_genre(name="Adventure"))
-    genre_repo.add(create_genre(name="Fantasy"))
-    session.commit()
-    
     country_repo = CountryOfProductionRepository(session=session)
     country_repo.add(create_country_of_production(name="USA"))
     
-    usecase = MovieUseCase(
-        session,
-        movie_repository=MovieRepository(session=session),
-        actor_repository=ActorRepository(session=session),
-        director_repository=DirectorRepository(session=session),
-        genre_repository=GenreRepository(session=session),
-        country_of_production_repository=CountryOfProductionRepository(session=session),
-    )
-    
     # -------------------
     # Act & Assert
     # -------------------